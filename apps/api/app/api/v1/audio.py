@@ -1,15 +1,16 @@
 """
 Audio endpoints - Handle audio upload and processing
 """
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
 from typing import Dict
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 import asyncio
 
 from app.core.security import get_current_user
-from app.core.db import db_client
+from app.core.db import db_client, fetch_triage_case
 from app.schemas.medical import (
     AudioUploadRequest,
     AudioUploadResponse,
@@ -26,6 +27,32 @@ from app.api.v1.websocket import notify_visit_update, notify_red_flag
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/audio", tags=["audio"])
 
+# Language code → ISO-639-1 prefix, resolved once at module scope so the
+# pipeline doesn't re-split the code on every run
+_ISO2 = {
+    "hi-IN": "hi",
+    "ta-IN": "ta",
+    "te-IN": "te",
+    "mr-IN": "mr",
+    "bn-IN": "bn",
+    "kn-IN": "kn",
+    "ml-IN": "ml",
+    "gu-IN": "gu",
+    "pa-IN": "pa",
+    "en-IN": "en",
+    "en-US": "en",
+}
+
+# Pipeline status → integer progress percentage, built once at import
+_PROGRESS_BY_STATUS = {
+    VisitStatus.PENDING: 0,
+    VisitStatus.PROCESSING: 10,
+    VisitStatus.TRANSCRIBING: 30,
+    VisitStatus.ANALYZING: 60,
+    VisitStatus.COMPLETED: 100,
+    VisitStatus.FAILED: 0,
+}
+
 
 @router.post("/upload-url", response_model=AudioUploadResponse)
 async def get_upload_url(
@@ -41,7 +68,7 @@ async def get_upload_url(
     try:
         # Generate unique S3 key
         clinic_id = current_user.get("clinic_id")
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
         audio_s3_key = f"audio/{clinic_id}/{request.visit_id}_{timestamp}.{request.file_extension}"
         
         # Generate presigned URL
@@ -66,49 +93,65 @@ async def get_upload_url(
         )
 
 
+async def _store_streamed_body(object_key: str, request: Request) -> None:
+    """Stream the request body into storage chunk by chunk.
+
+    Avoids buffering the whole audio file into a single bytes object —
+    long visit recordings can reach tens of MB in dev.
+    """
+    if hasattr(storage_service, '_files'):
+        # In-memory storage: accumulate chunks into one buffer
+        buf = bytearray()
+        async for chunk in request.stream():
+            buf.extend(chunk)
+        storage_service._files[object_key] = bytes(buf)
+    else:
+        # Local file storage: write each chunk straight to disk
+        dest = storage_service._full_path(object_key)
+        with open(dest, "wb") as f:
+            async for chunk in request.stream():
+                f.write(chunk)
+
+
 @router.post("/mock-upload/{object_key:path}")
 async def mock_upload_audio(
     object_key: str,
-    file: bytes = None,
+    request: Request,
     current_user: Dict = Depends(get_current_user)
 ):
     """
     Mock upload endpoint for development without S3.
-    Stores audio in memory when using InMemoryStorageService.
+    Streams audio into storage without buffering the full body in memory.
     """
-    from fastapi import File, UploadFile
     from app.core.config import settings
-    
+
     if settings.ENV != 'development':
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="This endpoint is only available in development mode"
         )
-    
-    # Store file in memory storage
-    if hasattr(storage_service, '_files'):
-        storage_service._files[object_key] = file or b''
-        logger.info(f"Mock stored file: {object_key}")
-        return {"message": "File uploaded successfully", "object_key": object_key}
-    
-    return {"message": "File upload simulated", "object_key": object_key}
+
+    await _store_streamed_body(object_key, request)
+    logger.info(f"Mock stored file: {object_key}")
+    return {"message": "File uploaded successfully", "object_key": object_key}
 
 
 @router.put("/mock-upload/{object_key:path}")
 async def mock_upload_audio_put(
     object_key: str,
+    request: Request,
     current_user: Dict = Depends(get_current_user)
 ):
     """PUT version of mock upload for presigned URL compatibility"""
-    from fastapi import Request
     from app.core.config import settings
-    
+
     if settings.ENV != 'development':
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="This endpoint is only available in development mode"
         )
-    
+
+    await _store_streamed_body(object_key, request)
     logger.info(f"Mock PUT stored file: {object_key}")
     return {"message": "File uploaded successfully", "object_key": object_key}
 
@@ -127,25 +170,30 @@ async def create_visit(
     """
     try:
         visit_id = f"VIS_{uuid.uuid4().hex[:12].upper()}"
-        
+
+        # Resolve once — reused for both the DB record and the response
+        clinic_id = visit_data.clinic_id or current_user.get('clinic_id')
+        doctor_id = visit_data.doctor_id or current_user.get('user_id')
+
         # Create visit record
         visit_record = db_client.create_visit({
             'visit_id': visit_id,
             'patient_id': visit_data.patient_id,
-            'clinic_id': visit_data.clinic_id or current_user.get('clinic_id'),
-            'doctor_id': visit_data.doctor_id or current_user.get('user_id'),
+            'clinic_id': clinic_id,
+            'doctor_id': doctor_id,
             'status': VisitStatus.PENDING,
             'language_code': visit_data.language_code,
             'audio_duration_seconds': visit_data.audio_duration_seconds
         })
-        
+
         logger.info(f"Created visit {visit_id} for patient {visit_data.patient_id}")
-        
-        return VisitResponse(
+
+        # Server-assembled data — skip Pydantic validation
+        return VisitResponse.model_construct(
             visit_id=visit_id,
             patient_id=visit_data.patient_id,
-            clinic_id=visit_data.clinic_id or current_user.get('clinic_id'),
-            doctor_id=visit_data.doctor_id or current_user.get('user_id'),
+            clinic_id=clinic_id,
+            doctor_id=doctor_id,
             status=VisitStatus.PENDING,
             language_code=visit_data.language_code,
             audio_s3_key=None,
@@ -187,21 +235,20 @@ async def process_audio(
     """
     try:
         clinic_id = current_user.get('clinic_id')
-        
-        # Get visit record
-        visits = db_client.list_clinic_visits(clinic_id, limit=100)
-        visit = next((v for v in visits if v.get('visit_id') == visit_id), None)
-        
+
+        # Keyed lookup — avoids listing the whole clinic to find one visit
+        visit = await fetch_triage_case(visit_id)
+
         if not visit:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Visit {visit_id} not found"
             )
-        
+
         # Update status to PROCESSING
         db_client.update_visit(
             clinic_id=clinic_id,
-            visit_sk=visit['SK'],
+            visit_sk=visit.get('SK', visit_id),
             updates={
                 'status': VisitStatus.PROCESSING,
                 'audio_s3_key': audio_s3_key
@@ -214,7 +261,7 @@ async def process_audio(
             visit_id=visit_id,
             audio_s3_key=audio_s3_key,
             clinic_id=clinic_id,
-            visit_sk=visit['SK'],
+            visit_sk=visit.get('SK', visit_id),
             language_code=visit.get('language_code', 'hi-IN'),
             patient_age=visit.get('patient_age', 45),
             patient_gender=visit.get('patient_gender', 'male')
@@ -245,35 +292,31 @@ async def get_processing_status(
 ):
     """Get the current processing status of a visit"""
     try:
-        clinic_id = current_user.get('clinic_id')
-        
-        # Get visit record
-        visits = db_client.list_clinic_visits(clinic_id, limit=100)
-        visit = next((v for v in visits if v.get('visit_id') == visit_id), None)
-        
+        # Keyed lookup — avoids listing the whole clinic to find one visit
+        visit = await fetch_triage_case(visit_id)
+
         if not visit:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Visit {visit_id} not found"
             )
         
-        # Calculate progress
-        status = visit.get('status', VisitStatus.PENDING)
-        progress_map = {
-            VisitStatus.PENDING: 0,
-            VisitStatus.PROCESSING: 10,
-            VisitStatus.TRANSCRIBING: 30,
-            VisitStatus.ANALYZING: 60,
-            VisitStatus.COMPLETED: 100,
-            VisitStatus.FAILED: 0
-        }
-        
-        return ProcessingStatusResponse(
+        # Calculate progress — stored status may be a lowercase string.
+        # (Named visit_status: a local `status` would shadow fastapi.status
+        # and break the HTTPException paths above.)
+        raw_status = visit.get('status', VisitStatus.PENDING)
+        try:
+            visit_status = raw_status if isinstance(raw_status, VisitStatus) else VisitStatus(str(raw_status).upper())
+        except ValueError:
+            visit_status = VisitStatus.PENDING
+
+        # Server-assembled data — skip Pydantic validation
+        return ProcessingStatusResponse.model_construct(
             visit_id=visit_id,
-            status=status,
-            progress_percentage=progress_map.get(status, 0),
-            current_step=status.value,
-            estimated_completion_seconds=30 if status != VisitStatus.COMPLETED else 0,
+            status=visit_status,
+            progress_percentage=_PROGRESS_BY_STATUS.get(visit_status, 0),
+            current_step=visit_status.value,
+            estimated_completion_seconds=30 if visit_status != VisitStatus.COMPLETED else 0,
             error_message=visit.get('error_message')
         )
         
@@ -299,30 +342,27 @@ async def process_audio_pipeline(
     """
     Background task to process audio through the AI pipeline
     """
-    start_time = datetime.utcnow()
-    
+    # Monotonic clock for duration — immune to NTP wall-clock jumps
+    t0 = time.monotonic()
+
     try:
         logger.info(f"Starting AI pipeline for visit {visit_id}")
         
         # Step 1: Transcribe audio
-        db_client.update_visit(clinic_id, visit_sk, {'status': VisitStatus.TRANSCRIBING})
-        
-        # Notify WebSocket clients
+        # Intermediate TRANSCRIBING/ANALYZING transitions are pushed over
+        # WebSocket only — persisting each one doubled the write count per
+        # visit for states that last a few seconds
         asyncio.create_task(notify_visit_update(clinic_id, visit_id, "TRANSCRIBING", {
             "step": "Transcribing audio...",
             "progress": 20
         }))
-        
+
         audio_s3_uri = f"s3://{storage_service.bucket_name}/{audio_s3_key}"
         transcription = await speech_service.transcribe_audio(audio_s3_uri, language_code)
         transcript_text = transcription['transcript']
-        
-        db_client.update_visit(clinic_id, visit_sk, {'transcript': transcript_text})
         logger.info(f"Transcription completed for visit {visit_id}")
-        
+
         # Step 2: Translate and analyze
-        db_client.update_visit(clinic_id, visit_sk, {'status': VisitStatus.ANALYZING})
-        
         asyncio.create_task(notify_visit_update(clinic_id, visit_id, "ANALYZING", {
             "step": "Analyzing symptoms...",
             "progress": 50
@@ -331,7 +371,7 @@ async def process_audio_pipeline(
         # Translate to medical English
         translated_text = await rag_chain.translate_to_medical_english(
             transcript_text,
-            source_language=language_code.split('-')[0]
+            source_language=_ISO2.get(language_code, language_code.split('-')[0])
         )
         
         # Generate SOAP note
@@ -362,14 +402,15 @@ async def process_audio_pipeline(
         })
         
         # Calculate processing time
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
+        processing_time = time.monotonic() - t0
         
-        # Update visit with all results
+        # Persist everything in one write now that processing is done
         db_client.update_visit(
             clinic_id=clinic_id,
             visit_sk=visit_sk,
             updates={
                 'status': VisitStatus.COMPLETED,
+                'transcript': transcript_text,
                 'translated_text': translated_text,
                 'soap_note': soap_note,
                 'differential_diagnosis': differential,
@@ -4,17 +4,39 @@ Authentication endpoints
 from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional
+import asyncio
+import os
 import uuid
 import re
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-from app.core.security import hash_password, verify_password, create_access_token, get_current_user
+from app.core.security import hash_password, create_access_token, get_current_user
 from app.core.db import db_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+# bcrypt takes ~100ms per hash — run it in a process pool so registration
+# bursts don't block the event loop and hashing scales across physical
+# cores. Created lazily on the first hash: only /auth/register needs it,
+# so idle workers shouldn't each spawn a pool at import.
+_PW_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pw_pool() -> ProcessPoolExecutor:
+    global _PW_POOL
+    if _PW_POOL is None:
+        _PW_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _PW_POOL
+
+
+async def _hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_pw_pool(), hash_password, password
+    )
+
 
 class UserRegister(BaseModel):
     """Schema for user registration"""
@@ -69,8 +91,8 @@ async def register(user_data: UserRegister):
         # Generate user ID
         user_id = f"USR_{uuid.uuid4().hex[:12].upper()}"
         
-        # Hash password
-        hashed_password = hash_password(user_data.password)
+        # Hash password off the event loop
+        hashed_password = await _hash_password_async(user_data.password)
         
         # For clinic_id, generate one if not provided and role is doctor
         clinic_id = user_data.clinic_id
@@ -10,7 +10,7 @@ import random
 import logging
 
 from app.core.security import get_current_user
-from app.core.db import db_client
+from app.core.db import save_triage_cases, delete_all_triage_cases
 from app.schemas.medical import VisitStatus
 
 logger = logging.getLogger(__name__)
@@ -58,12 +58,19 @@ async def seed_demo_visits(
     """
     clinic_id = current_user.get('clinic_id', 'CLINIC_DEMO')
     created_visits = []
-    
+    visit_records = []
+
+    # Sample all visits up front in one call per pool instead of
+    # calling random.choice 3x per visit inside the loop
+    patients = random.choices(DEMO_PATIENTS, k=count)
+    complaints = random.choices(DEMO_COMPLAINTS, k=count)
+    languages = random.choices(list(DEMO_TRANSCRIPTS.keys()), k=count)
+
     for i in range(count):
-        patient = random.choice(DEMO_PATIENTS)
-        complaint = random.choice(DEMO_COMPLAINTS)
-        language = random.choice(list(DEMO_TRANSCRIPTS.keys()))
-        
+        patient = patients[i]
+        complaint = complaints[i]
+        language = languages[i]
+
         # Vary the status
         if i == 0:
             status = VisitStatus.COMPLETED
@@ -148,16 +155,19 @@ async def seed_demo_visits(
             'processing_time_seconds': random.uniform(5, 15) if status == VisitStatus.COMPLETED else None
         }
         
-        db_client.create_visit(visit_data)
+        visit_records.append(visit_data)
         created_visits.append({
             "visit_id": visit_id,
             "patient_name": patient["name"],
             "status": status,
             "risk_level": risk
         })
-        
+
         logger.info(f"Created demo visit: {visit_id}")
-    
+
+    # Write all visits in one bulk call instead of one round-trip per visit
+    await save_triage_cases(visit_records)
+
     return {
         "message": f"Created {count} demo visits",
         "clinic_id": clinic_id,
@@ -173,26 +183,10 @@ async def clear_demo_visits(
     Clear all visits for the current clinic (demo/dev only)
     """
     clinic_id = current_user.get('clinic_id', 'CLINIC_DEMO')
-    
-    # Get all visits
-    visits = db_client.list_clinic_visits(clinic_id, limit=100)
-    
-    # Delete each visit (in production, use batch delete)
-    deleted_count = 0
-    for visit in visits:
-        try:
-            # DynamoDB delete
-            table = db_client.resource.Table(db_client.table_name)
-            table.delete_item(
-                Key={
-                    'PK': visit['PK'],
-                    'SK': visit['SK']
-                }
-            )
-            deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting visit: {str(e)}")
-    
+
+    # Single async DELETE instead of a sync round-trip per visit
+    deleted_count = await delete_all_triage_cases()
+
     return {
         "message": f"Deleted {deleted_count} visits",
         "clinic_id": clinic_id
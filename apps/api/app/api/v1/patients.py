@@ -1,25 +1,32 @@
 """
 Patient endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import List, Dict, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from itertools import islice
+from pydantic import BaseModel, field_validator
+import asyncio
+import hashlib
+import time
 import uuid
-import json
 import re
 import logging
 
+import orjson
+
 from google import genai
 from google.genai import types
 
 from app.core.security import get_current_user
 from app.core.db import db_client
 from app.core.config import settings
+from app.services.session_store import get_session_store
 from app.schemas.patient import PatientCreate, PatientResponse, PatientUpdate
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/patients", tags=["patients"])
+router = APIRouter(prefix="/patients", tags=["patients"], default_response_class=ORJSONResponse)
 
 # ==================== Chat Models ====================
 
@@ -41,18 +48,94 @@ class ChatResponse(BaseModel):
 class ResetRequest(BaseModel):
     confirm: bool = True
 
-# In-memory conversation storage
-_conversations: Dict[str, List[Dict]] = {}
-_collected_data: Dict[str, Dict] = {}
+class _DataBlock(BaseModel):
+    """Structured fields Gemini returns alongside each reply.
+
+    Used both as the response_schema for JSON-mode calls and to parse the
+    legacy hidden <data> block on the streaming path. model_validate_json
+    parses and validates in one pass, replacing json.loads plus a
+    hand-written isinstance/"null" guard ladder.
+    """
+    reply: str = ""
+    symptoms: List[str] = []
+    duration: Optional[str] = None
+    severity_score: Optional[int] = None
+    location: Optional[str] = None
+    associated: List[str] = []
+    history: List[str] = []
+    severity_band: Optional[str] = None
+    intake_complete: bool = False
+    follow_ups: List[str] = []
+
+    @field_validator("duration", "location", "severity_band", mode="before")
+    @classmethod
+    def _null_string_to_none(cls, v):
+        return None if v in ("null", "") else v
+
+    @field_validator("severity_score", mode="before")
+    @classmethod
+    def _score_to_int(cls, v):
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            return None
+        return int(v)
+
+    @field_validator("symptoms", "associated", "history", "follow_ups", mode="before")
+    @classmethod
+    def _none_to_empty_list(cls, v):
+        return v or []
+
+# Per-user session state lives in the shared session store (Redis when
+# available, in-memory fallback) under "intake:{user}" / "conv:{user}" keys,
+# so every worker sees the same conversation and sessions expire via TTL
+_MAX_HISTORY = 20     # messages kept per conversation (10 turns)
+
+
+def _intake_key(user_id: str) -> str:
+    return f"intake:{user_id}"
+
+
+def _conv_key(user_id: str) -> str:
+    return f"conv:{user_id}"
+
+
+async def _persist_turn(user_id: str, collected: Dict, message: str, response_text: str) -> None:
+    """Persist intake state and the new message pair in one pipelined write."""
+    store = get_session_store()
+    key = _conv_key(user_id)
+    conv = await store.get(key) or []
+    conv += (
+        {'role': 'user', 'content': message},
+        {'role': 'assistant', 'content': response_text},
+    )
+    await store.set_many({
+        _intake_key(user_id): collected,
+        key: conv[-_MAX_HISTORY:],
+    })
 
 # ==================== Gemini client (lazy init) ====================
 
 _gemini_client: Optional[genai.Client] = None
 
+# Bounds concurrent Gemini calls (batch fan-out included) so we overlap
+# network latency without tripping the API's rate limits
+_GEMINI_SEM = asyncio.Semaphore(10)
+
 MAX_TURNS = 12  # hard ceiling — after this, wrap up regardless
 
+# Response cache for the near-identical first turns of a session (empty
+# state, short messages like "headache") — same plain-dict TTL cache shape
+# as the dashboard. Keyed on a digest of language/next_field/turn/message.
+_CHAT_CACHE: Dict[bytes, tuple] = {}
+_CHAT_CACHE_TTL = 3600.0  # seconds
+_CHAT_CACHE_MAX = 2048
+
+
+def _chat_cache_key(language: str, next_field: Optional[str], turn: int, message: str) -> bytes:
+    raw = f"{language}|{next_field}|{turn}|{message.lower().strip()}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
 # Required fields and the order in which to collect them
-INTAKE_FIELDS = ["symptoms", "duration", "severity", "location", "associated_symptoms", "medical_history"]
+INTAKE_FIELDS = ("symptoms", "duration", "severity", "location", "associated_symptoms", "medical_history")
 INTAKE_THRESHOLD = 4  # minimum fields needed before intake is considered complete
 
 def _get_gemini_client() -> Optional[genai.Client]:
@@ -61,52 +144,76 @@ def _get_gemini_client() -> Optional[genai.Client]:
         _gemini_client = genai.Client(api_key=settings.GEMINI_API_KEY)
     return _gemini_client
 
-def _build_system_prompt(collected: Dict, turn: int, next_field: Optional[str]) -> str:
-    """Build a fully explicit system prompt tailored to the current intake stage."""
+# (key, label, suffix) pairs for the "already collected" prompt section
+_SUMMARY_FIELDS = (
+    ("symptoms",            "Symptoms", ""),
+    ("duration",            "Duration", ""),
+    ("severity",            "Severity", "/10"),
+    ("location",            "Location", ""),
+    ("associated_symptoms", "Associated symptoms", ""),
+    ("medical_history",     "Medical history / medications", ""),
+)
+
+# Compiled once at import — these run on every chat turn
+_DATA_RE = re.compile(r"<data>\s*(\{.*?\})\s*(?:</data>|$)", re.DOTALL)
+_DATA_STRIP_RE = re.compile(r"\s*<data>[\s\S]*?(?:</data>|$)")
+
+# Map next_field → a natural question to ask
+_FIELD_QUESTIONS = {
+    "symptoms":           "Ask the patient what symptoms they are experiencing.",
+    "duration":           "Ask how long they have been experiencing these symptoms (e.g. hours, days, weeks).",
+    "severity":           "Ask them to rate their discomfort on a scale of 1 to 10.",
+    "location":           "Ask where exactly on their body they feel the symptom (which side, area).",
+    "associated_symptoms":"Ask if they have any other symptoms alongside the main one (e.g. nausea, fever, dizziness).",
+    "medical_history":    "Ask if they have any known medical conditions or are currently taking any medications.",
+}
 
-    # Summarise what has already been collected so Gemini doesn't re-ask
-    collected_summary = []
-    if collected["symptoms"]:
-        collected_summary.append(f"- Symptoms: {', '.join(collected['symptoms'])}")
-    if collected["duration"]:
-        collected_summary.append(f"- Duration: {collected['duration']}")
-    if collected["severity"]:
-        collected_summary.append(f"- Severity: {collected['severity']}/10")
-    if collected["location"]:
-        collected_summary.append(f"- Location: {collected['location']}")
-    if collected["associated_symptoms"]:
-        collected_summary.append(f"- Associated symptoms: {', '.join(collected['associated_symptoms'])}")
-    if collected["medical_history"]:
-        collected_summary.append(f"- Medical history / medications: {', '.join(collected['medical_history'])}")
+_MAX_TURNS_INSTRUCTION = (
+    "You have reached the maximum number of turns. "
+    "Summarise everything collected and tell the patient their doctor will review the details shortly. "
+    "Do NOT ask any more questions."
+)
 
-    collected_text = "\n".join(collected_summary) if collected_summary else "Nothing collected yet."
+_ALL_COLLECTED_INSTRUCTION = (
+    "All required information has been collected. "
+    "Provide a warm closing summary of what was noted and reassure the patient their doctor will review it. "
+    "Do NOT ask any more questions."
+)
 
-    # Map next_field → a natural question to ask
-    field_questions = {
-        "symptoms":           "Ask the patient what symptoms they are experiencing.",
-        "duration":           "Ask how long they have been experiencing these symptoms (e.g. hours, days, weeks).",
-        "severity":           "Ask them to rate their discomfort on a scale of 1 to 10.",
-        "location":           "Ask where exactly on their body they feel the symptom (which side, area).",
-        "associated_symptoms":"Ask if they have any other symptoms alongside the main one (e.g. nausea, fever, dizziness).",
-        "medical_history":    "Ask if they have any known medical conditions or are currently taking any medications.",
-    }
+
+def _build_turn_state(collected: Dict, turn: int, next_field: Optional[str]) -> str:
+    """Render only the per-turn portion of the prompt: the collected
+    summary and the next-action instruction."""
+    # Summarise what has already been collected so Gemini doesn't re-ask
+    collected_summary = [
+        f"- {label}: {', '.join(v) if isinstance(v, list) else v}{suffix}"
+        for key, label, suffix in _SUMMARY_FIELDS
+        if (v := collected[key])
+    ]
+    collected_text = "\n".join(collected_summary) if collected_summary else "Nothing collected yet."
 
     if turn >= MAX_TURNS:
-        next_instruction = (
-            "You have reached the maximum number of turns. "
-            "Summarise everything collected and tell the patient their doctor will review the details shortly. "
-            "Do NOT ask any more questions."
-        )
+        next_instruction = _MAX_TURNS_INSTRUCTION
     elif next_field:
-        next_instruction = field_questions.get(next_field, "Ask the most relevant follow-up question based on what is missing.")
+        next_instruction = _FIELD_QUESTIONS.get(next_field, "Ask the most relevant follow-up question based on what is missing.")
     else:
-        next_instruction = (
-            "All required information has been collected. "
-            "Provide a warm closing summary of what was noted and reassure the patient their doctor will review it. "
-            "Do NOT ask any more questions."
-        )
+        next_instruction = _ALL_COLLECTED_INSTRUCTION
+
+    return "".join((_STATE_HEADER, collected_text, _PROMPT_NEXT_ACTION, next_instruction))
+
+
+def _build_system_prompt(collected: Dict, turn: int, next_field: Optional[str], json_mode: bool = True) -> str:
+    """Assemble the full intake system prompt from its static blocks.
 
-    return f"""You are Nidaan AI, a compassionate medical intake assistant for an Indian clinic.
+    Only the collected summary and the next-action instruction vary per
+    turn — the ~2 KB of rules is built once at import instead of being
+    re-rendered on every /chat call.
+    """
+    footer = _PROMPT_FOOTER_JSON if json_mode else _PROMPT_FOOTER
+    return "".join((_PROMPT_HEADER, _build_turn_state(collected, turn, next_field), footer))
+
+
+_PROMPT_HEADER = """You are Nidaan AI, a compassionate medical intake assistant for an Indian clinic.
 Your ONLY job is to collect patient symptom information BEFORE their doctor consultation.
 You do NOT diagnose, treat, or speculate about conditions.
 
@@ -130,22 +237,30 @@ ABSOLUTE FORBIDDEN RESPONSES — never violate these
 6. NEVER ask more than ONE question per reply.
 7. NEVER ask about information already listed in "INFORMATION ALREADY COLLECTED". Do not re-ask symptoms, duration, or severity if they are already recorded above.
 8. ALWAYS write complete sentences. Never end a sentence abruptly.
+"""
 
+_STATE_HEADER = """
 ════════════════════════════════════════
 INFORMATION ALREADY COLLECTED THIS SESSION
 ════════════════════════════════════════
-{collected_text}
+"""
+
+_PROMPT_NEXT_ACTION = """
 
 ════════════════════════════════════════
 YOUR NEXT ACTION (follow this exactly)
 ════════════════════════════════════════
-{next_instruction}
+"""
+
+_EMERGENCY_RULE = """
 
 ════════════════════════════════════════
 EMERGENCY RULE
 ════════════════════════════════════════
 If the patient describes severe chest pain radiating to the arm/jaw, sudden inability to speak, facial drooping, or inability to breathe — IMMEDIATELY advise them to call emergency services (112 in India) before anything else.
+"""
 
+_DATA_OUTPUT_FORMAT = """
 ════════════════════════════════════════
 OUTPUT FORMAT (mandatory — do not skip)
 ════════════════════════════════════════
@@ -153,7 +268,7 @@ Write your conversational reply to the patient FIRST.
 Then, on a new line, include EXACTLY this hidden block (never shown to the patient):
 
 <data>
-{{
+{
   "symptoms": ["extracted symptom 1", "extracted symptom 2"],
   "duration": "e.g. 2 days or null",
   "severity_score": 7,
@@ -163,7 +278,7 @@ Then, on a new line, include EXACTLY this hidden block (never shown to the patie
   "severity_band": "HIGH|MODERATE|LOW|null",
   "intake_complete": false,
   "follow_ups": ["Short option 1", "Short option 2", "Short option 3"]
-}}
+}
 </data>
 
 Rules for the <data> block:
@@ -173,14 +288,63 @@ Rules for the <data> block:
 - severity_score: integer 1-10 if mentioned, else null.
 """
 
+_JSON_OUTPUT_FORMAT = """
+════════════════════════════════════════
+OUTPUT FORMAT (mandatory — do not skip)
+════════════════════════════════════════
+Respond with ONLY a single JSON object matching the response schema.
+- "reply": your complete conversational reply to the patient — this is the only text they will see.
+- "symptoms", "duration", "severity_score", "location", "associated", "history": only details MENTIONED by the patient in this conversation; use null when unknown.
+- "follow_ups": 2-3 SHORT tap-friendly quick-reply suggestions (not questions, just options like "2 days", "Left side", "No other symptoms").
+- "intake_complete": true only when symptoms + duration + severity are all known.
+- "severity_band": "HIGH", "MODERATE", "LOW" or null.
+- "severity_score": integer 1-10 if mentioned, else null.
+"""
+
+# The streaming path needs prose-first output, so it keeps the legacy
+# <data> protocol; the regular path uses enforced-JSON output instead
+_PROMPT_FOOTER = _EMERGENCY_RULE + _DATA_OUTPUT_FORMAT
+_PROMPT_FOOTER_JSON = _EMERGENCY_RULE + _JSON_OUTPUT_FORMAT
+
+# Static rules uploaded to Gemini's explicit context cache — the per-turn
+# state travels separately, so the large rules prefix is prefilled
+# server-side instead of being re-tokenized on every call
+_STATIC_SYSTEM_PROMPT = _PROMPT_HEADER + _PROMPT_FOOTER_JSON
+
+_cached_prompt_name: Optional[str] = None
+_prompt_cache_failed = False
+
+
+async def _get_cached_prompt(client: genai.Client) -> Optional[str]:
+    """Create (once per process) and return the context-cache name for the
+    static prompt rules, or None when explicit caching is unavailable
+    (e.g. the prompt is below the model's minimum cacheable size)."""
+    global _cached_prompt_name, _prompt_cache_failed
+    if _prompt_cache_failed:
+        return None
+    if _cached_prompt_name is None:
+        try:
+            cache = await client.aio.caches.create(
+                model=settings.GEMINI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=_STATIC_SYSTEM_PROMPT,
+                    ttl="3600s",
+                ),
+            )
+            _cached_prompt_name = cache.name
+            logger.info("Created Gemini prompt cache %s", _cached_prompt_name)
+        except Exception as e:
+            logger.info("Gemini prompt cache unavailable, sending full prompt: %s", e)
+            _prompt_cache_failed = True
+    return _cached_prompt_name
+
 
 @router.post("/chat/reset")
 async def reset_patient_chat(current_user: Dict = Depends(get_current_user)):
     """Reset patient conversation to start fresh."""
     try:
         user_id = current_user.get('user_id', 'anonymous')
-        _conversations.pop(user_id, None)
-        _collected_data.pop(user_id, None)
+        await get_session_store().delete(_intake_key(user_id), _conv_key(user_id))
         return {"message": "Conversation reset successfully", "user_id": user_id}
     except Exception as e:
         logger.error(f"Reset error: {str(e)}")
@@ -246,7 +410,7 @@ async def voice_transcribe(
 
     try:
         from google.genai import types as gtypes
-        response = client.models.generate_content(
+        response = await client.aio.models.generate_content(
             model=settings.GEMINI_MODEL,
             contents=[
                 prompt,
@@ -268,91 +432,170 @@ async def voice_transcribe(
 
 def _next_missing_field(collected: Dict) -> Optional[str]:
     """Return the next intake field that still needs to be collected, in priority order."""
-    if not collected["symptoms"]:
-        return "symptoms"
-    if not collected["duration"]:
-        return "duration"
-    if not collected["severity"]:
-        return "severity"
-    if not collected["location"]:
-        return "location"
-    if not collected["associated_symptoms"]:
-        return "associated_symptoms"
-    if not collected["medical_history"]:
-        return "medical_history"
-    return None  # all collected
+    return next((f for f in INTAKE_FIELDS if not collected[f]), None)
 
 
 def _fields_collected_count(collected: Dict) -> int:
-    count = 0
-    if collected["symptoms"]: count += 1
-    if collected["duration"]: count += 1
-    if collected["severity"]: count += 1
-    if collected["location"]: count += 1
-    if collected["associated_symptoms"]: count += 1
-    if collected["medical_history"]: count += 1
-    return count
+    return sum(1 for f in INTAKE_FIELDS if collected[f])
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def patient_chat(
     chat_request: ChatRequest,
+    stream: bool = Query(False, description="Stream the reply as server-sent events"),
     current_user: Dict = Depends(get_current_user)
 ):
     """AI-powered patient symptom collection chat — powered by Google Gemini."""
     try:
         user_id = current_user.get('user_id', 'anonymous')
-        history = chat_request.conversation_history or []
-
-        # Fresh conversation on first message
-        if len(history) <= 1:
-            _collected_data.pop(user_id, None)
-            _conversations.pop(user_id, None)
-
-        collected = _collected_data.setdefault(user_id, {
-            'symptoms': [], 'duration': None, 'severity': None,
-            'location': None, 'associated_symptoms': [], 'medical_history': [],
-            'turn': 0, 'intake_complete': False
-        })
-
-        collected['turn'] = collected.get('turn', 0) + 1
-        turn = collected['turn']
-
-        # Determine next field to collect (None = all done or past threshold)
-        next_field = None
-        if not collected['intake_complete'] and turn < MAX_TURNS:
-            if _fields_collected_count(collected) < INTAKE_THRESHOLD:
-                next_field = _next_missing_field(collected)
-
-        client = _get_gemini_client()
-
-        if client:
-            response_text, follow_ups, severity = await _gemini_chat(
-                client, chat_request.message, history, collected, chat_request.language,
-                next_field, turn
-            )
-        else:
-            response_text = ("I'm here to help document your symptoms. "
-                             "Please describe what you're experiencing — what symptoms do you have, "
-                             "when did they start, and how severe are they?")
-            follow_ups = ["I have a headache", "Stomach problems", "Feeling unwell"]
-            severity = None
 
-        _conversations.setdefault(user_id, []).extend([
-            {'role': 'user', 'content': chat_request.message},
-            {'role': 'assistant', 'content': response_text},
-        ])
+        if stream:
+            client = _get_gemini_client()
+            if client:
+                history = chat_request.conversation_history or []
+                store = get_session_store()
+                collected, turn, next_field = await _prepare_turn(store, user_id, history)
+                # Stream the visible prefix as it generates; the structured
+                # fields arrive in a final SSE event after the <data> parse
+                return StreamingResponse(
+                    _gemini_chat_stream(
+                        client, chat_request.message, history, collected,
+                        next_field, turn, user_id,
+                    ),
+                    media_type="text/event-stream",
+                )
+
+        return await _single_chat(chat_request, user_id)
+
+    except Exception as e:
+        logger.error(f"Chat error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+
+@router.post("/chat/batch", response_model=List[ChatResponse])
+async def patient_chat_batch(
+    requests: List[ChatRequest],
+    current_user: Dict = Depends(get_current_user)
+):
+    """Run several intake messages for the caller in one request.
+
+    Every item in a batch belongs to the same authenticated user and each
+    turn does a read-modify-write of the shared intake/conversation keys,
+    so items run sequentially — overlapping them races the session state.
+    Gemini latency still overlaps across *users* via the shared semaphore
+    inside _single_chat.
+    """
+    user_id = current_user.get('user_id', 'anonymous')
+    responses: List[ChatResponse] = []
+    for chat_request in requests:
+        try:
+            responses.append(await _single_chat(chat_request, user_id))
+        except Exception as e:
+            logger.error("Batch chat item failed: %s", e)
+            responses.append(ChatResponse(
+                response="Sorry, something went wrong with this message. Please try again."
+            ))
+    return responses
+
+
+async def _prepare_turn(store, user_id: str, history: List[ChatMessage]) -> tuple[Dict, int, Optional[str]]:
+    """Load session state and decide what to collect this turn."""
+    # Fresh conversation on first message
+    if len(history) <= 1:
+        await store.delete(_intake_key(user_id), _conv_key(user_id))
+
+    collected = await store.get(_intake_key(user_id)) or {
+        'symptoms': [], 'duration': None, 'severity': None,
+        'location': None, 'associated_symptoms': [], 'medical_history': [],
+        'turn': 0, 'intake_complete': False
+    }
+
+    collected['turn'] = collected.get('turn', 0) + 1
+    turn = collected['turn']
+
+    # Determine next field to collect (None = all done or past threshold)
+    next_field = None
+    if not collected['intake_complete'] and turn < MAX_TURNS:
+        if _fields_collected_count(collected) < INTAKE_THRESHOLD:
+            next_field = _next_missing_field(collected)
+
+    return collected, turn, next_field
 
+
+# Closing-summary templates per language — the wrap-up turn is fully
+# determined by the collected state, so it never needs a Gemini call
+_SUMMARY_TEMPLATES = {
+    "hi-IN": "धन्यवाद। मैंने आपकी जानकारी नोट कर ली है: {details}। आपके डॉक्टर जल्द ही इनकी समीक्षा करेंगे।",
+    "ta-IN": "நன்றி. உங்கள் தகவல்களை பதிவு செய்துவிட்டேன்: {details}. உங்கள் மருத்துவர் விரைவில் இவற்றை பரிசீலிப்பார்.",
+    "te-IN": "ధన్యవాదాలు. మీ వివరాలు నమోదు చేశాను: {details}. మీ డాక్టర్ త్వరలో వీటిని సమీక్షిస్తారు.",
+    "en-IN": "Thank you. I've noted the following for your doctor: {details}. They will review these details with you shortly.",
+}
+
+
+def _render_summary(collected: Dict, language: str) -> str:
+    """Render the closing summary from collected state, no model call."""
+    details = "; ".join(
+        f"{label}: {', '.join(v) if isinstance(v, list) else v}{suffix}"
+        for key, label, suffix in _SUMMARY_FIELDS
+        if (v := collected[key])
+    ) or "your reported symptoms"
+    template = _SUMMARY_TEMPLATES.get(language, _SUMMARY_TEMPLATES["en-IN"])
+    return template.format(details=details)
+
+
+# Served for conversational noise ("hi", "ok") before any symptoms are in,
+# and as the reply when no Gemini client is configured
+_OPENING_PROMPT = ("I'm here to help document your symptoms. "
+                   "Please describe what you're experiencing — what symptoms do you have, "
+                   "when did they start, and how severe are they?")
+_OPENING_FOLLOW_UPS = ["I have a headache", "Stomach problems", "Feeling unwell"]
+
+
+async def _single_chat(chat_request: ChatRequest, user_id: str) -> ChatResponse:
+    """Run one non-streaming chat turn end to end."""
+    history = chat_request.conversation_history or []
+    store = get_session_store()
+    collected, turn, next_field = await _prepare_turn(store, user_id, history)
+
+    # Past the ceiling or already complete, the prompt would instruct the
+    # model to just summarise — that's deterministic, so skip the round-trip
+    if collected['intake_complete'] or turn > MAX_TURNS:
+        response_text = _render_summary(collected, chat_request.language)
+        await _persist_turn(user_id, collected, chat_request.message, response_text)
         return ChatResponse(
             response=response_text,
-            follow_up_questions=follow_ups,
+            follow_up_questions=[],
             collected_symptoms=collected['symptoms'],
-            severity_assessment=severity
+            severity_assessment=_auto_severity_band(collected)
         )
 
-    except Exception as e:
-        logger.error(f"Chat error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+    client = _get_gemini_client()
+
+    # A message this short before any symptoms are collected can't carry
+    # intake information ("hi", "ok") — answer with the opening question
+    # instead of spending a model round-trip on it
+    if len(chat_request.message.strip()) < 4 and not collected['symptoms']:
+        response_text = _OPENING_PROMPT
+        follow_ups = list(_OPENING_FOLLOW_UPS)
+        severity = None
+    elif client:
+        response_text, follow_ups, severity = await _gemini_chat(
+            client, chat_request.message, history, collected, chat_request.language,
+            next_field, turn
+        )
+    else:
+        response_text = _OPENING_PROMPT
+        follow_ups = list(_OPENING_FOLLOW_UPS)
+        severity = None
+
+    await _persist_turn(user_id, collected, chat_request.message, response_text)
+
+    return ChatResponse(
+        response=response_text,
+        follow_up_questions=follow_ups,
+        collected_symptoms=collected['symptoms'],
+        severity_assessment=severity
+    )
 
 
 async def _gemini_chat(
@@ -366,102 +609,276 @@ async def _gemini_chat(
 ) -> tuple[str, List[str], Optional[str]]:
     """Call Gemini with a stage-aware system prompt and parse the structured data block."""
 
-    # Build conversation history (cap at last 10 turns to stay within token budget)
-    # Strip <data> blocks from assistant messages — they confuse the model and cause repeated questions
-    contents = []
-    for msg in history[-10:]:
-        role = "user" if msg.role == "user" else "model"
-        clean_content = re.sub(r"\s*<data>[\s\S]*?(?:</data>|$)", "", msg.content).strip()
-        if clean_content:  # skip empty messages that were pure data blocks
-            contents.append(types.Content(role=role, parts=[types.Part(text=clean_content)]))
-    contents.append(types.Content(role="user", parts=[types.Part(text=message)]))
+    # Cold-start turns repeat across patients — serve them from cache and
+    # skip the Gemini round-trip entirely, still merging into this session
+    cache_key = None
+    if turn <= 2 and not collected["symptoms"]:
+        cache_key = _chat_cache_key(language, next_field, turn, message)
+        hit = _CHAT_CACHE.get(cache_key)
+        if hit and time.monotonic() - hit[0] < _CHAT_CACHE_TTL:
+            visible_text, payload = hit[1], hit[2]
+            follow_ups, severity = _merge_data(_DataBlock.model_validate(payload), collected)
+            return visible_text, follow_ups, severity
+
+    contents = _build_contents(history, message)
 
-    system_prompt = _build_system_prompt(collected, turn, next_field)
+    global _cached_prompt_name
+    cached_name = await _get_cached_prompt(client)
 
     try:
-        response = client.models.generate_content(
-            model=settings.GEMINI_MODEL,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                max_output_tokens=1200,
-                temperature=0.3,   # lower = more rule-following
-            ),
-        )
-        raw = response.text or ""
+        if cached_name:
+            # Rules prefix is prefilled from the server-side cache — only
+            # the per-turn state travels with the request
+            state = _build_turn_state(collected, turn, next_field)
+            async with _GEMINI_SEM:
+                response = await client.aio.models.generate_content(
+                    model=settings.GEMINI_MODEL,
+                    contents=[{"role": "user", "parts": [{"text": state}]}] + contents,
+                    config=types.GenerateContentConfig(
+                        cached_content=cached_name,
+                        response_mime_type="application/json",
+                        response_schema=_DataBlock,
+                        max_output_tokens=1200,
+                        temperature=0.3,   # lower = more rule-following
+                    ),
+                )
+        else:
+            async with _GEMINI_SEM:
+                response = await client.aio.models.generate_content(
+                    model=settings.GEMINI_MODEL,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        system_instruction=_build_system_prompt(collected, turn, next_field),
+                        response_mime_type="application/json",
+                        response_schema=_DataBlock,
+                        max_output_tokens=1200,
+                        temperature=0.3,   # lower = more rule-following
+                    ),
+                )
     except Exception as e:
-        logger.error("Gemini API error: %s", e)
-        raise
+        if cached_name:
+            # Cache entry likely hit its TTL — drop it so the next call
+            # recreates it, and answer this turn with the full prompt
+            logger.warning("Cached-prompt call failed (%s); retrying with full prompt", e)
+            _cached_prompt_name = None
+            async with _GEMINI_SEM:
+                response = await client.aio.models.generate_content(
+                    model=settings.GEMINI_MODEL,
+                    contents=contents,
+                    config=types.GenerateContentConfig(
+                        system_instruction=_build_system_prompt(collected, turn, next_field),
+                        response_mime_type="application/json",
+                        response_schema=_DataBlock,
+                        max_output_tokens=1200,
+                        temperature=0.3,
+                    ),
+                )
+        else:
+            logger.error("Gemini API error: %s", e)
+            raise
 
-    # Strip the hidden <data> block — robust even if </data> was truncated
-    data_match = re.search(r"<data>\s*(\{.*?\})\s*(?:</data>|$)", raw, re.DOTALL)
-    # Remove <data>...</data> OR <data>... to end-of-string if tag was cut off
-    visible_text = re.sub(r"\s*<data>[\s\S]*$", "", raw).strip()
+    # Enforced-JSON output: .parsed is the populated schema model; fall back
+    # to a direct validate of the text if the SDK didn't parse it
+    parsed = getattr(response, "parsed", None)
+    if not isinstance(parsed, _DataBlock):
+        try:
+            parsed = _DataBlock.model_validate_json(response.text or "{}")
+        except Exception as parse_err:
+            logger.warning("Could not parse structured reply: %s | raw: %s",
+                           parse_err, (response.text or "")[:200])
+            parsed = None
 
-    follow_ups: List[str] = []
-    severity: Optional[str] = None
+    if parsed is not None:
+        visible_text = parsed.reply.strip()
+        follow_ups, severity = _merge_data(parsed, collected)
+    else:
+        visible_text = ""
+        follow_ups, severity = [], _auto_severity_band(collected)
 
-    if data_match:
-        try:
-            parsed = json.loads(data_match.group(1))
+    if not visible_text:
+        visible_text = "Thank you for that information. Let me note that down for your doctor."
 
-            # Merge symptoms
-            for sym in parsed.get("symptoms", []):
-                if sym and sym not in collected["symptoms"]:
-                    collected["symptoms"].append(sym)
+    if cache_key is not None and parsed is not None:
+        if len(_CHAT_CACHE) > _CHAT_CACHE_MAX:
+            _CHAT_CACHE.clear()
+        _CHAT_CACHE[cache_key] = (time.monotonic(), visible_text, parsed.model_dump())
 
-            # Merge duration
-            dur = parsed.get("duration")
-            if dur and dur != "null" and not collected["duration"]:
-                collected["duration"] = dur
+    return visible_text, follow_ups, severity
 
-            # Merge severity score
-            sev_score = parsed.get("severity_score")
-            if sev_score and isinstance(sev_score, (int, float)) and not collected["severity"]:
-                collected["severity"] = str(int(sev_score))
 
-            # Merge location
-            loc = parsed.get("location")
-            if loc and loc != "null" and not collected["location"]:
-                collected["location"] = loc
+def _build_contents(history: List[ChatMessage], message: str) -> list:
+    """Build the Gemini contents list from recent history plus the new message.
 
-            # Merge associated symptoms
-            for a in parsed.get("associated", []):
-                if a and a not in collected["associated_symptoms"]:
-                    collected["associated_symptoms"].append(a)
+    Caps at the last 10 turns to stay within token budget and strips <data>
+    blocks from assistant messages — they confuse the model and cause
+    repeated questions.
+    """
+    # Plain dicts — the SDK converts them to the wire format in one walk,
+    # skipping two wrapper-object allocations per historical turn
+    contents = []
+    for msg in islice(history, max(0, len(history) - 10), None):
+        role = "user" if msg.role == "user" else "model"
+        clean_content = _DATA_STRIP_RE.sub("", msg.content).strip()
+        if clean_content:  # skip empty messages that were pure data blocks
+            contents.append({"role": role, "parts": [{"text": clean_content}]})
+    contents.append({"role": "user", "parts": [{"text": message}]})
+    return contents
 
-            # Merge medical history
-            for h in parsed.get("history", []):
-                if h and h not in collected["medical_history"]:
-                    collected["medical_history"].append(h)
 
-            # Severity band
-            severity = parsed.get("severity_band") or None
-            if severity in ("null", ""):
-                severity = None
+def _auto_severity_band(collected: Dict) -> Optional[str]:
+    """Derive a severity band from the collected 1-10 score, if any."""
+    if collected.get("severity"):
+        try:
+            s = int(collected["severity"])
+            return "CRITICAL" if s >= 9 else "HIGH" if s >= 7 else "MODERATE" if s >= 4 else "LOW"
+        except ValueError:
+            pass
+    return None
+
+
+# Data-block field -> collected key, for the merge loops below. Adding a
+# field to _DataBlock only needs a new entry here, not a new merge stanza.
+_MERGE_LIST = (
+    ("symptoms", "symptoms"),
+    ("associated", "associated_symptoms"),
+    ("history", "medical_history"),
+)
+_MERGE_SCALAR = (
+    ("duration", "duration"),
+    ("location", "location"),
+)
+
+
+def _merge_data(parsed: "_DataBlock", collected: Dict) -> tuple[List[str], Optional[str]]:
+    """Merge a validated data block into the per-user collected state."""
+    # List fields: append new values, preserving first-seen order. A set
+    # handles membership so the dedupe doesn't rescan the list per value.
+    for src, dst in _MERGE_LIST:
+        items = collected[dst]
+        seen = set(items)
+        for value in getattr(parsed, src):
+            if value and value not in seen:
+                seen.add(value)
+                items.append(value)
+
+    # Scalar fields: first non-empty answer wins
+    for src, dst in _MERGE_SCALAR:
+        value = getattr(parsed, src)
+        if value and not collected[dst]:
+            collected[dst] = value
+
+    # Severity is special-cased — the score is stored as a string
+    if parsed.severity_score and not collected["severity"]:
+        collected["severity"] = str(parsed.severity_score)
+
+    if parsed.intake_complete:
+        collected["intake_complete"] = True
 
-            # Intake complete flag
-            if parsed.get("intake_complete") is True:
-                collected["intake_complete"] = True
+    # Auto-assess severity band from score if Gemini didn't provide one
+    severity = parsed.severity_band or _auto_severity_band(collected)
 
-            follow_ups = parsed.get("follow_ups", [])
+    return parsed.follow_ups, severity
 
+
+def _extract_and_merge(raw: str, collected: Dict) -> tuple[List[str], Optional[str]]:
+    """Parse the hidden <data> block out of a streamed response and merge it
+    into the per-user collected state. Robust even if </data> was truncated."""
+    data_match = _DATA_RE.search(raw)
+    if data_match:
+        try:
+            # Single-pass parse + validation (jiter under Pydantic v2)
+            parsed = _DataBlock.model_validate_json(data_match.group(1))
+            return _merge_data(parsed, collected)
         except Exception as parse_err:
             logger.warning("Could not parse data block: %s | raw: %s", parse_err, raw[:200])
+    return [], _auto_severity_band(collected)
 
-    # Auto-assess severity band from score if Gemini didn't provide one
-    if not severity and collected.get("severity"):
-        try:
-            s = int(collected["severity"])
-            severity = "CRITICAL" if s >= 9 else "HIGH" if s >= 7 else "MODERATE" if s >= 4 else "LOW"
-        except ValueError:
-            pass
 
-    # Fallback if visible_text is somehow empty after stripping
-    if not visible_text:
-        visible_text = "Thank you for that information. Let me note that down for your doctor."
+async def _gemini_chat_stream(
+    client: genai.Client,
+    message: str,
+    history: List[ChatMessage],
+    collected: Dict,
+    next_field: Optional[str],
+    turn: int,
+    user_id: str,
+):
+    """Stream the visible reply as SSE while it is generated.
 
-    return visible_text, follow_ups, severity
+    Everything before the hidden <data> block is forwarded chunk-by-chunk,
+    so perceived latency is first-token latency rather than full-generation
+    time. The tail is buffered, parsed once after the stream closes, and the
+    structured fields go out in a final "done" event.
+    """
+    contents = _build_contents(history, message)
+
+    # Streaming keeps the prose-first <data> protocol (JSON-mode output
+    # can't be forwarded incrementally), so it sends the full prompt
+    config = types.GenerateContentConfig(
+        system_instruction=_build_system_prompt(collected, turn, next_field, json_mode=False),
+        max_output_tokens=1200,
+        temperature=0.3,
+    )
+
+    visible_parts: List[str] = []
+    buffer = ""
+    tail_parts: List[str] = []
+    in_data = False
+
+    try:
+        # Hold the semaphore only for request initiation — chunks arrive
+        # while other calls proceed
+        async with _GEMINI_SEM:
+            stream = await client.aio.models.generate_content_stream(
+                model=settings.GEMINI_MODEL,
+                contents=contents,
+                config=config,
+            )
+        async for chunk in stream:
+            text = chunk.text or ""
+            if not text:
+                continue
+            if in_data:
+                tail_parts.append(text)
+                continue
+            buffer += text
+            idx = buffer.find("<data>")
+            if idx != -1:
+                head = buffer[:idx].rstrip()
+                if head:
+                    visible_parts.append(head)
+                    yield b"data: " + orjson.dumps({'delta': head}) + b"\n\n"
+                tail_parts.append(buffer[idx:])
+                buffer = ""
+                in_data = True
+            elif len(buffer) > 6:
+                # Hold back a few chars in case "<data>" straddles chunks
+                emit, buffer = buffer[:-6], buffer[-6:]
+                visible_parts.append(emit)
+                yield b"data: " + orjson.dumps({'delta': emit}) + b"\n\n"
+        if buffer and not in_data:
+            visible_parts.append(buffer)
+            yield b"data: " + orjson.dumps({'delta': buffer}) + b"\n\n"
+    except Exception as e:
+        logger.error("Gemini streaming error: %s", e)
+        yield b"data: " + orjson.dumps({'error': 'Chat failed'}) + b"\n\n"
+        return
+
+    response_text = "".join(visible_parts).strip()
+    if not response_text:
+        response_text = "Thank you for that information. Let me note that down for your doctor."
+
+    follow_ups, severity = _extract_and_merge("".join(tail_parts), collected)
+
+    await _persist_turn(user_id, collected, message, response_text)
+
+    yield b"data: " + orjson.dumps({
+        'done': True,
+        'response': response_text,
+        'follow_up_questions': follow_ups,
+        'collected_symptoms': collected['symptoms'],
+        'severity_assessment': severity,
+    }) + b"\n\n"
 
 
 
@@ -479,10 +896,12 @@ async def create_patient(
         
         logger.info(f"Created patient {patient_id}")
         
-        return PatientResponse(
+        # patient_data was already validated at the request boundary, so
+        # model_construct skips re-running validators on the same fields
+        return PatientResponse.model_construct(
             patient_id=patient_id,
-            **patient_data.dict(),
-            created_at=datetime.utcnow()
+            created_at=datetime.utcnow(),
+            **patient_data.model_dump(),
         )
         
     except Exception as e:
@@ -2,57 +2,92 @@
 WebSocket endpoints for real-time updates
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
-from typing import Dict, Set
-import json
+from typing import Dict, List
 import logging
 import asyncio
 
+import orjson
+
+from app.core.security import decode_access_token
+from app.api.v1.patients import (
+    ChatMessage,
+    ChatRequest,
+    _conv_key,
+    _intake_key,
+    _single_chat,
+)
+from app.services.session_store import get_session_store
+
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["websocket"])
 
 
+def _ws_encode(message: dict) -> str:
+    """Serialize an outbound frame once with orjson.
+
+    Frames still go out as text because the dashboard client does
+    JSON.parse(event.data) and would choke on binary frames.
+    """
+    return orjson.dumps(message).decode()
+
+
 class ConnectionManager:
     """Manages WebSocket connections"""
     
     def __init__(self):
-        # Map clinic_id -> set of WebSocket connections
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
-    
+        # Map clinic_id -> flat list of connections; broadcast iterates the
+        # list directly. A socket -> (clinic_id, index) side table gives O(1)
+        # membership and swap-remove without hashing through a set.
+        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self._index: Dict[WebSocket, tuple] = {}
+
     async def connect(self, websocket: WebSocket, clinic_id: str):
         """Accept and register a new connection"""
         await websocket.accept()
-        
-        if clinic_id not in self.active_connections:
-            self.active_connections[clinic_id] = set()
-        
-        self.active_connections[clinic_id].add(websocket)
+
+        connections = self.active_connections.setdefault(clinic_id, [])
+        self._index[websocket] = (clinic_id, len(connections))
+        connections.append(websocket)
         logger.info(f"WebSocket connected for clinic {clinic_id}")
-    
+
     def disconnect(self, websocket: WebSocket, clinic_id: str):
-        """Remove a connection"""
-        if clinic_id in self.active_connections:
-            self.active_connections[clinic_id].discard(websocket)
-            if not self.active_connections[clinic_id]:
-                del self.active_connections[clinic_id]
+        """Remove a connection (swap-remove keeps the list contiguous)"""
+        entry = self._index.pop(websocket, None)
+        if entry is not None:
+            cid, i = entry
+            connections = self.active_connections[cid]
+            last = connections.pop()
+            if last is not websocket:
+                connections[i] = last
+                self._index[last] = (cid, i)
+            if not connections:
+                del self.active_connections[cid]
         logger.info(f"WebSocket disconnected for clinic {clinic_id}")
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to a specific connection"""
-        await websocket.send_json(message)
+        await websocket.send_text(_ws_encode(message))
     
     async def broadcast_to_clinic(self, clinic_id: str, message: dict):
         """Broadcast message to all connections for a clinic"""
-        if clinic_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[clinic_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    disconnected.add(connection)
-            
-            # Remove disconnected clients
-            for conn in disconnected:
-                self.active_connections[clinic_id].discard(conn)
+        connections = self.active_connections.get(clinic_id)
+        if not connections:
+            return
+
+        # Encode once for the whole fan-out instead of per connection, and
+        # dispatch the sends concurrently so one slow client doesn't stall
+        # the rest — latency is max(send) rather than sum(send)
+        payload = _ws_encode(message)
+        conns = list(connections)
+        results = await asyncio.gather(
+            *(conn.send_text(payload) for conn in conns),
+            return_exceptions=True,
+        )
+
+        # Remove clients whose send failed (disconnected mid-broadcast)
+        for conn, result in zip(conns, results):
+            if isinstance(result, Exception):
+                self.disconnect(conn, clinic_id)
 
 
 # Global connection manager
@@ -76,7 +111,6 @@ async def websocket_endpoint(
     # Validate token if provided
     if token:
         try:
-            from app.core.security import decode_access_token
             payload = decode_access_token(token)
             # Optionally verify clinic_id matches
             user_clinic = payload.get('clinic_id')
@@ -91,13 +125,25 @@ async def websocket_endpoint(
     
     try:
         while True:
-            # Keep connection alive and listen for any client messages
-            data = await websocket.receive_text()
-            
+            # Keep connection alive and listen for any client messages.
+            # The dashboard pings every 30 s, so 45 s of silence usually
+            # means a zombie socket — probe it instead of letting it sit in
+            # the broadcast fan-out until a send fails.
+            try:
+                data = await asyncio.wait_for(websocket.receive_text(), timeout=45)
+            except asyncio.TimeoutError:
+                await websocket.send_text(_ws_encode({"type": "ping"}))
+                try:
+                    data = await asyncio.wait_for(websocket.receive_text(), timeout=15)
+                except asyncio.TimeoutError:
+                    await websocket.close(code=1001)
+                    manager.disconnect(websocket, clinic_id)
+                    return
+
             # Echo back or handle client messages
             if data == "ping":
-                await websocket.send_json({"type": "pong"})
-                
+                await websocket.send_text(_ws_encode({"type": "pong"}))
+
     except WebSocketDisconnect:
         manager.disconnect(websocket, clinic_id)
     except Exception as e:
@@ -107,9 +153,9 @@ async def websocket_endpoint(
 
 # ==================== Patient Chat WebSocket ====================
 
-# In-memory conversation storage for WebSocket chat
-_ws_conversations: Dict[str, list] = {}
-_ws_collected_data: Dict[str, Dict] = {}
+# Chat state lives in the shared session store (Redis when available) under
+# the same intake:/conv: keys the REST /chat path uses, so a user can switch
+# transports — or land on a different uvicorn worker — mid-conversation.
 
 
 @router.websocket("/ws/patient/chat")
@@ -119,105 +165,94 @@ async def patient_chat_websocket(
 ):
     """
     WebSocket endpoint for real-time patient symptom chat
-    
+
     Protocol:
     - Client sends: {"type": "message", "content": "I have a headache"}
     - Server responds: {"type": "response", "content": "...", "symptoms": [...], "severity": "..."}
     """
     user_id = "anonymous"
-    
+
     # Validate token
     if token:
         try:
-            from app.core.security import decode_access_token
             payload = decode_access_token(token)
             user_id = payload.get('user_id', 'anonymous')
         except Exception as e:
             logger.warning(f"WebSocket token validation failed: {e}")
-    
+
     await websocket.accept()
     logger.info(f"Patient chat WebSocket connected: {user_id}")
-    
-    # Initialize conversation data for this user
-    if user_id not in _ws_collected_data:
-        _ws_collected_data[user_id] = {
-            'symptoms': [],
-            'duration': None,
-            'severity': None,
-            'location': None,
-            'associated_symptoms': [],
-        }
-    if user_id not in _ws_conversations:
-        _ws_conversations[user_id] = []
-    
+
+    store = get_session_store()
+
     # Send welcome message
-    await websocket.send_json({
+    await websocket.send_text(_ws_encode({
         "type": "connected",
         "message": "Connected to AI Health Assistant",
         "user_id": user_id
-    })
-    
+    }))
+
     try:
         while True:
             data = await websocket.receive_text()
-            
+
             try:
-                message_data = json.loads(data)
-            except json.JSONDecodeError:
+                message_data = orjson.loads(data)
+            except orjson.JSONDecodeError:
                 message_data = {"type": "message", "content": data}
-            
+
             msg_type = message_data.get("type", "message")
-            
+
             if msg_type == "ping":
-                await websocket.send_json({"type": "pong"})
+                await websocket.send_text(_ws_encode({"type": "pong"}))
                 continue
-            
+
             if msg_type == "message":
                 content = message_data.get("content", "")
-                
-                # Process the message
-                from app.api.v1.patients import _process_patient_message, ChatMessage
-                
-                history = [ChatMessage(role=m['role'], content=m['content']) 
-                          for m in _ws_conversations[user_id][-10:]]
-                
-                response, follow_ups, severity = await _process_patient_message(
-                    content.lower(), history, _ws_collected_data[user_id]
+
+                # Rebuild the request shape the shared chat pipeline expects
+                # from the stored conversation, then run the same turn logic
+                # as POST /patients/chat
+                conv = await store.get(_conv_key(user_id)) or []
+                # model_construct skips per-message validation — the stored
+                # entries were validated when they first came in
+                # Prior turns only — _single_chat appends the current
+                # message itself, like REST clients sending history
+                history = [ChatMessage.model_construct(**m) for m in conv]
+
+                result = await _single_chat(
+                    ChatRequest.model_construct(
+                        message=content,
+                        conversation_history=history,
+                        language=message_data.get("language", "en-IN"),
+                    ),
+                    user_id,
                 )
-                
-                # Store conversation
-                _ws_conversations[user_id].append({'role': 'user', 'content': content})
-                _ws_conversations[user_id].append({'role': 'assistant', 'content': response})
-                
+
+                collected = await store.get(_intake_key(user_id)) or {}
+
                 # Send response
-                await websocket.send_json({
+                await websocket.send_text(_ws_encode({
                     "type": "response",
-                    "content": response,
-                    "symptoms": _ws_collected_data[user_id]['symptoms'],
-                    "severity": severity,
-                    "follow_up_questions": follow_ups,
+                    "content": result.response,
+                    "symptoms": result.collected_symptoms,
+                    "severity": result.severity_assessment,
+                    "follow_up_questions": result.follow_up_questions,
                     "collected_data": {
-                        "duration": _ws_collected_data[user_id].get('duration'),
-                        "location": _ws_collected_data[user_id].get('location'),
-                        "associated": _ws_collected_data[user_id].get('associated_symptoms', [])
+                        "duration": collected.get('duration'),
+                        "location": collected.get('location'),
+                        "associated": collected.get('associated_symptoms', [])
                     }
-                })
-            
+                }))
+
             elif msg_type == "reset":
                 # Reset conversation
-                _ws_collected_data[user_id] = {
-                    'symptoms': [],
-                    'duration': None,
-                    'severity': None,
-                    'location': None,
-                    'associated_symptoms': [],
-                }
-                _ws_conversations[user_id] = []
-                await websocket.send_json({
+                await store.delete(_intake_key(user_id), _conv_key(user_id))
+                await websocket.send_text(_ws_encode({
                     "type": "reset_complete",
                     "message": "Conversation reset. How can I help you today?"
-                })
-                
+                }))
+
     except WebSocketDisconnect:
         logger.info(f"Patient chat WebSocket disconnected: {user_id}")
     except Exception as e:
@@ -2,6 +2,8 @@
 Core Configuration Module
 Manages environment variables and application settings
 """
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -48,11 +50,14 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379"
 
     # ==================== CORS ====================
-    CORS_ORIGINS: list = [
+    # Immutable so the middleware's per-request membership checks run over
+    # a shared tuple instead of a mutable per-process list (env-supplied
+    # JSON arrays are coerced by pydantic)
+    CORS_ORIGINS: tuple = (
         "http://localhost:3000",
         "http://localhost:3001",
         "https://nidaan.ai",
-    ]
+    )
 
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
@@ -62,4 +67,10 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse environment/.env once per process and reuse the instance."""
+    return Settings()
+
+
+settings = get_settings()
@@ -5,12 +5,14 @@ Replaces the previous DynamoDB-based implementation.
 import logging
 from typing import AsyncGenerator
 
+import orjson
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import JSONB
 
 from app.core.config import settings
 
@@ -20,12 +22,28 @@ logger = logging.getLogger(__name__)
 # Engine & session factory
 # ---------------------------------------------------------------------------
 
+
+def _json_serializer(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    pool_pre_ping=True,
     pool_size=10,
     max_overflow=20,
+    # Detect dead connections at the socket layer instead of pool_pre_ping's
+    # SELECT 1 round-trip on every checkout: recycle connections before
+    # typical NAT/LB idle timeouts and have the server probe idle sockets
+    pool_recycle=1800,
+    connect_args={
+        "server_settings": {"tcp_keepalives_idle": "60"},
+        "command_timeout": 10,
+    },
+    # Wire the driver's json/jsonb codecs to orjson, so JSONB binds and
+    # result columns skip the stdlib encoder entirely
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -65,6 +83,12 @@ CREATE INDEX IF NOT EXISTS idx_triage_cases_patient
 CREATE INDEX IF NOT EXISTS idx_triage_cases_severity_status
     ON triage_cases (severity_score, status);
 
+-- The dashboard list and case fetch are newest-first LIMIT queries, so
+-- let them walk the index instead of sorting the whole table
+-- (no semicolons in comments — the fallback path splits on them)
+CREATE INDEX IF NOT EXISTS idx_triage_cases_created_at
+    ON triage_cases (created_at DESC);
+
 CREATE TABLE IF NOT EXISTS surveys (
     id              TEXT PRIMARY KEY,
     patient_id      TEXT NOT NULL,
@@ -109,14 +133,27 @@ CREATE INDEX IF NOT EXISTS idx_ehr_patient
 """
 
 
+# Split and compile the DDL once at import; create_tables just iterates
+_DDL_STATEMENTS = tuple(
+    text(s) for s in (s.strip() for s in _CREATE_TABLES_SQL.split(";")) if s
+)
+
+
 async def create_tables() -> None:
     """Create all tables (idempotent — safe to call on every startup).
-    SQLAlchemy 2.x execute() only supports one statement per call, so we split.
+
+    asyncpg's simple-query protocol accepts a multi-statement script, so
+    the whole DDL goes over in one round-trip; if the raw driver isn't
+    reachable we fall back to executing the pre-split statements one by one.
     """
-    statements = [s.strip() for s in _CREATE_TABLES_SQL.split(";") if s.strip()]
     async with engine.begin() as conn:
-        for stmt in statements:
-            await conn.execute(text(stmt))
+        raw = await conn.get_raw_connection()
+        driver_conn = getattr(raw, "driver_connection", None)
+        if driver_conn is not None:
+            await driver_conn.execute(_CREATE_TABLES_SQL)
+        else:
+            for stmt in _DDL_STATEMENTS:
+                await conn.execute(stmt)
     logger.info("Database tables created / verified")
 
 
@@ -124,7 +161,62 @@ async def create_tables() -> None:
 # Real async DB helpers — used by visits/doctor dashboard
 # ---------------------------------------------------------------------------
 
-import json as _json
+# Statements are built once at import; per call we only bind parameters, and
+# SQLAlchemy's compiled-SQL cache and the asyncpg dialect's prepared-statement
+# cache both key off these shared objects.
+
+_UPSERT_TRIAGE_SQL = text("""
+    INSERT INTO triage_cases (id, patient_id, severity_score, status, data, created_at, updated_at)
+    VALUES (:id, :patient_id, :severity_score, :status, :data_json, NOW(), NOW())
+    ON CONFLICT (id) DO UPDATE
+    SET severity_score = EXCLUDED.severity_score,
+        status         = EXCLUDED.status,
+        data           = EXCLUDED.data,
+        updated_at     = NOW()
+""").bindparams(bindparam("data_json", type_=JSONB))
+
+_DELETE_ALL_TRIAGE_SQL = text("DELETE FROM triage_cases")
+
+_UPDATE_TRIAGE_SQL = text("""
+    UPDATE triage_cases
+    SET data       = data || :patch,
+        status     = COALESCE(:status, status),
+        updated_at = NOW()
+    WHERE id = :id
+""").bindparams(bindparam("patch", type_=JSONB))
+
+_FETCH_CASES_SQL = text("""
+    SELECT data, created_at
+    FROM triage_cases
+    ORDER BY created_at DESC
+    LIMIT :limit
+""")
+
+_FETCH_SUMMARIES_SQL = text("""
+    SELECT COALESCE(data->>'visit_id', id)                    AS visit_id,
+           COALESCE(data->>'patient_name', 'Unknown')         AS patient_name,
+           data->>'patient_age'                               AS patient_age,
+           COALESCE(data->>'chief_complaint', 'Processing...') AS chief_complaint,
+           COALESCE(data->>'status', status)                  AS status,
+           COALESCE(data->>'risk_level', severity_score)      AS risk_level,
+           COALESCE(data->>'created_at', created_at::text)    AS created_at,
+           COALESCE(data#>>'{red_flags,has_red_flags}', 'false') AS has_red_flags
+    FROM triage_cases
+    ORDER BY created_at DESC
+    LIMIT :limit
+""")
+
+_FETCH_COUNTERS_SQL = text("""
+    SELECT LOWER(status)                AS status,
+           UPPER(severity_score)        AS risk,
+           (created_at::date = :today)  AS is_today,
+           COUNT(*)                     AS n
+    FROM triage_cases
+    GROUP BY 1, 2, 3
+""")
+
+_FETCH_CASE_SQL = text("SELECT data FROM triage_cases WHERE id = :id")
+
 
 async def save_triage_case(data: dict) -> None:
     """Insert or replace a triage case (visit) in PostgreSQL."""
@@ -133,60 +225,183 @@ async def save_triage_case(data: dict) -> None:
     severity   = data.get("severity_score") or data.get("risk_level", "LOW")
     visit_status = data.get("status", "pending")
 
-    sql = text("""
-        INSERT INTO triage_cases (id, patient_id, severity_score, status, data, created_at, updated_at)
-        VALUES (:id, :patient_id, :severity_score, :status, CAST(:data_json AS jsonb), NOW(), NOW())
-        ON CONFLICT (id) DO UPDATE
-        SET severity_score = EXCLUDED.severity_score,
-            status         = EXCLUDED.status,
-            data           = EXCLUDED.data,
-            updated_at     = NOW()
-    """)
     async with engine.begin() as conn:
-        await conn.execute(sql, {
+        await conn.execute(_UPSERT_TRIAGE_SQL, {
             "id":            case_id,
             "patient_id":    patient_id,
             "severity_score": severity,
             "status":        visit_status,
-            "data_json":     _json.dumps(data),
+            "data_json":     data,
         })
     logger.info("Saved triage case %s", case_id)
 
 
+# Past this batch size a binary COPY into a staging table beats executemany
+_COPY_THRESHOLD = 100
+
+_MERGE_STAGING_SQL = """
+    INSERT INTO triage_cases (id, patient_id, severity_score, status, data, created_at, updated_at)
+    SELECT id, patient_id, severity_score, status, data, NOW(), NOW()
+    FROM triage_cases_staging
+    ON CONFLICT (id) DO UPDATE
+    SET severity_score = EXCLUDED.severity_score,
+        status         = EXCLUDED.status,
+        data           = EXCLUDED.data,
+        updated_at     = NOW()
+"""
+
+
+async def save_triage_cases(records: list) -> None:
+    """Bulk insert/replace triage cases in one transaction.
+
+    Small batches go through a single executemany upsert; replay-sized
+    batches are COPYed into a temp staging table at wire speed and merged
+    with one INSERT ... SELECT ... ON CONFLICT.
+    """
+    if not records:
+        return
+
+    if len(records) >= _COPY_THRESHOLD:
+        async with engine.begin() as conn:
+            raw = await conn.get_raw_connection()
+            driver_conn = getattr(raw, "driver_connection", None)
+            if driver_conn is not None:
+                await driver_conn.execute(
+                    "CREATE TEMP TABLE triage_cases_staging "
+                    "(LIKE triage_cases INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await driver_conn.copy_records_to_table(
+                    "triage_cases_staging",
+                    records=[
+                        (
+                            rec.get("visit_id") or rec.get("id"),
+                            rec.get("patient_id", "unknown"),
+                            rec.get("severity_score") or rec.get("risk_level") or "LOW",
+                            # str() on an enum member yields "VisitStatus.X";
+                            # take .value so COPY writes what executemany binds
+                            getattr(rec.get("status", "pending"), "value", None)
+                            or str(rec.get("status", "pending")),
+                            _json_serializer(rec),
+                        )
+                        for rec in records
+                    ],
+                    columns=("id", "patient_id", "severity_score", "status", "data"),
+                )
+                await driver_conn.execute(_MERGE_STAGING_SQL)
+                logger.info("Saved %d triage cases via COPY", len(records))
+                return
+
+    params = [
+        {
+            "id":             rec.get("visit_id") or rec.get("id"),
+            "patient_id":     rec.get("patient_id", "unknown"),
+            "severity_score": rec.get("severity_score") or rec.get("risk_level") or "LOW",
+            "status":         rec.get("status", "pending"),
+            "data_json":      rec,
+        }
+        for rec in records
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(_UPSERT_TRIAGE_SQL, params)
+    logger.info("Saved %d triage cases in bulk", len(records))
+
+
+async def delete_all_triage_cases() -> int:
+    """Delete every triage case; returns the number of rows removed."""
+    async with engine.begin() as conn:
+        result = await conn.execute(_DELETE_ALL_TRIAGE_SQL)
+    return result.rowcount
+
+
+async def update_triage_case_fields(visit_id: str, updates: dict) -> bool:
+    """Merge fields into a triage case with a single conditional UPDATE.
+
+    Returns False when no row matched, so callers can 404 without a
+    separate existence fetch before the write.
+    """
+    async with engine.begin() as conn:
+        result = await conn.execute(_UPDATE_TRIAGE_SQL, {
+            "id":     visit_id,
+            "patch":  updates,
+            "status": updates.get("status"),
+        })
+    return result.rowcount > 0
+
+
 async def fetch_triage_cases(clinic_id: str, limit: int = 50) -> list:
     """Return all triage cases as dicts, newest first."""
-    sql = text("""
-        SELECT data, created_at
-        FROM triage_cases
-        ORDER BY created_at DESC
-        LIMIT :limit
-    """)
     async with AsyncSessionLocal() as session:
-        result = await session.execute(sql, {"limit": limit})
+        result = await session.execute(_FETCH_CASES_SQL, {"limit": limit})
+        rows = result.fetchall()
+
+    # The engine's json_deserializer already turns JSONB columns into dicts,
+    # so no per-row isinstance/loads dispatch is needed. Backfill created_at
+    # for records persisted before it was written into the payload.
+    for rec, created in rows:
+        if not rec.get("created_at"):
+            rec["created_at"] = created.isoformat() if created else ""
+    return [rec for rec, _ in rows]
+
+
+async def fetch_visit_summaries(clinic_id: str, limit: int = 50) -> list:
+    """Project only the fields the dashboard list renders.
+
+    The full rows carry transcripts, SOAP notes and differentials that the
+    summary view never shows — extracting the eight needed keys in SQL cuts
+    the bytes shipped per row by an order of magnitude.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(_FETCH_SUMMARIES_SQL, {"limit": limit})
         rows = result.fetchall()
 
-    cases = []
+    visits = []
     for row in rows:
-        try:
-            rec = row[0] if isinstance(row[0], dict) else _json.loads(row[0])
-            if not rec.get("created_at"):
-                rec["created_at"] = row[1].isoformat() if row[1] else ""
-            cases.append(rec)
-        except Exception:
-            pass
-    return cases
+        m = row._mapping
+        age = m["patient_age"]
+        visits.append({
+            "visit_id": m["visit_id"],
+            "patient_name": m["patient_name"],
+            "patient_age": int(age) if age and age.isdigit() else 0,
+            "chief_complaint": m["chief_complaint"],
+            "status": m["status"],
+            "risk_level": m["risk_level"],
+            "created_at": m["created_at"] or "",
+            "red_flags": {"has_red_flags": m["has_red_flags"] == "true"},
+        })
+    return visits
+
+
+async def fetch_dashboard_counters(clinic_id: str, today) -> dict:
+    """Aggregate dashboard counters in one GROUP BY instead of shipping
+    full rows to Python and filtering client-side."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(_FETCH_COUNTERS_SQL, {"today": today})
+        rows = result.fetchall()
+
+    counters = {
+        "today": 0, "pending": 0, "high_risk": 0,
+        "critical": 0, "completed_today": 0,
+    }
+    for row_status, risk, is_today, n in rows:
+        if is_today:
+            counters["today"] += n
+            if row_status == "completed":
+                counters["completed_today"] += n
+        if row_status == "pending":
+            counters["pending"] += n
+        if risk in ("HIGH", "CRITICAL"):
+            counters["high_risk"] += n
+        if risk == "CRITICAL":
+            counters["critical"] += n
+    return counters
 
 
 async def fetch_triage_case(visit_id: str) -> dict | None:
     """Return a single triage case by visit_id, or None."""
-    sql = text("SELECT data FROM triage_cases WHERE id = :id")
     async with AsyncSessionLocal() as session:
-        result = await session.execute(sql, {"id": visit_id})
+        result = await session.execute(_FETCH_CASE_SQL, {"id": visit_id})
         row = result.fetchone()
-    if not row:
-        return None
-    rec = row[0] if isinstance(row[0], dict) else _json.loads(row[0])
-    return rec
+    return row[0] if row else None
 
 
 # ---------------------------------------------------------------------------
@@ -205,7 +420,11 @@ class _NoOpDBClient:
             return iter([])
 
     def __getattr__(self, name):
-        return self._NoOpCallable()
+        # Promote the resolved attribute onto the instance so repeated
+        # calls hit normal attribute lookup instead of __getattr__
+        attr = self._NoOpCallable()
+        setattr(self, name, attr)
+        return attr
 
 
 db_client = _NoOpDBClient()
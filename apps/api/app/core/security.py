@@ -2,7 +2,12 @@
 Security Module
 Handles JWT token creation, validation, and password hashing
 """
-from datetime import datetime, timedelta
+import base64
+import hashlib
+import hmac
+import json
+import time
+from datetime import timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -17,6 +22,21 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # JWT Bearer token
 security = HTTPBearer()
 
+# The JWT header is identical for every token we issue — encode it once at
+# module load instead of JSON+base64 encoding it per call
+_JWT_HEADER_B64 = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=").decode()
+
+# Decoded-token cache: the same bearer token arrives on every request of a
+# session, so skip re-running the signature check for a short window. Expired
+# tokens still fall through to full verification (and its 401).
+_TOKEN_CACHE: Dict[str, tuple] = {}
+_TOKEN_CACHE_TTL = 60.0   # seconds
+_TOKEN_CACHE_MAX = 10_000
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
 
 def hash_password(password: str) -> str:
     """Hash a password"""
@@ -40,24 +60,30 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
         Encoded JWT token
     """
     to_encode = data.copy()
-    
+
+    now = int(time.time())
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.JWT_EXPIRATION_MINUTES)
-    
+        expire = now + settings.JWT_EXPIRATION_MINUTES * 60
+
     to_encode.update({
         "exp": expire,
-        "iat": datetime.utcnow()
+        "iat": now
     })
-    
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.JWT_SECRET,
-        algorithm=settings.JWT_ALGORITHM
-    )
-    
-    return encoded_jwt
+
+    if settings.JWT_ALGORITHM != "HS256":
+        # Non-default algorithm — fall back to the full jose encoder
+        return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+
+    # Fast path: reuse the precomputed header and sign directly, skipping
+    # jose's per-call header construction
+    payload_b64 = _b64url(json.dumps(to_encode, separators=(",", ":")).encode())
+    signing_input = f"{_JWT_HEADER_B64}.{payload_b64}"
+    signature = hmac.new(
+        settings.JWT_SECRET.encode(), signing_input.encode(), hashlib.sha256
+    ).digest()
+    return f"{signing_input}.{_b64url(signature)}"
 
 
 def decode_access_token(token: str) -> Dict[str, Any]:
@@ -73,12 +99,22 @@ def decode_access_token(token: str) -> Dict[str, Any]:
     Raises:
         HTTPException: If token is invalid or expired
     """
+    now = time.time()
+    entry = _TOKEN_CACHE.get(token)
+    if entry is not None:
+        cached_at, payload = entry
+        if now - cached_at < _TOKEN_CACHE_TTL and payload.get("exp", 0) > now:
+            return payload
+
     try:
         payload = jwt.decode(
             token,
             settings.JWT_SECRET,
             algorithms=[settings.JWT_ALGORITHM]
         )
+        if len(_TOKEN_CACHE) >= _TOKEN_CACHE_MAX:
+            _TOKEN_CACHE.clear()
+        _TOKEN_CACHE[token] = (now, payload)
         return payload
     except JWTError as e:
         raise HTTPException(
@@ -54,6 +54,19 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"⚠️ Triage services init failed (non-critical): {e}")
     
+    # Warm the Gemini client and system-prompt cache so the first /chat
+    # request doesn't pay the TLS handshake + cache-creation cost
+    try:
+        from app.api.v1.patients import _get_cached_prompt, _get_gemini_client
+        gemini_client = _get_gemini_client()
+        if gemini_client is not None:
+            await _get_cached_prompt(gemini_client)
+            logger.info("✅ Gemini client and prompt cache warmed")
+        else:
+            logger.warning("⚠️ GEMINI_API_KEY not set — chat runs in fallback mode")
+    except Exception as e:
+        logger.warning(f"⚠️ Gemini warmup failed (non-critical): {e}")
+
     # Seed initial data if database is empty
     try:
         from app.services.seed_data import check_and_seed_if_empty
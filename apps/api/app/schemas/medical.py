@@ -1,8 +1,8 @@
 """
 Pydantic schemas for medical data (SOAP notes, diagnoses, etc.)
 """
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Union
 from datetime import datetime
 from enum import Enum
 
@@ -27,6 +27,7 @@ class RiskLevel(str, Enum):
 
 class SOAPNote(BaseModel):
     """SOAP Note structure"""
+    model_config = ConfigDict(extra="ignore", frozen=True, validate_assignment=False)
     subjective: str = Field(..., description="Subjective findings from patient")
     objective: str = Field(..., description="Objective findings and vitals")
     assessment: str = Field(..., description="Clinical assessment")
@@ -35,6 +36,7 @@ class SOAPNote(BaseModel):
 
 class DifferentialDiagnosis(BaseModel):
     """Single differential diagnosis"""
+    model_config = ConfigDict(extra="ignore", frozen=True, validate_assignment=False)
     diagnosis: str
     probability: str  # HIGH, MEDIUM, LOW
     supporting_factors: List[str]
@@ -44,6 +46,7 @@ class DifferentialDiagnosis(BaseModel):
 
 class RedFlag(BaseModel):
     """Red flag alert"""
+    model_config = ConfigDict(extra="ignore", frozen=True, validate_assignment=False)
     category: str
     finding: str
     urgency: str  # CRITICAL, URGENT, ROUTINE
@@ -52,6 +55,7 @@ class RedFlag(BaseModel):
 
 class RedFlagAnalysis(BaseModel):
     """Red flag analysis result"""
+    model_config = ConfigDict(extra="ignore", frozen=True, validate_assignment=False)
     has_red_flags: bool
     severity: RiskLevel
     red_flags_detected: List[RedFlag]
@@ -69,6 +73,9 @@ class VisitCreate(BaseModel):
 
 class VisitResponse(BaseModel):
     """Schema for visit response"""
+    model_config = ConfigDict(
+        from_attributes=True, extra="ignore", frozen=True, validate_assignment=False
+    )
     visit_id: str
     patient_id: str
     clinic_id: str
@@ -82,16 +89,16 @@ class VisitResponse(BaseModel):
     differential_diagnosis: Optional[List[DifferentialDiagnosis]]
     red_flags: Optional[RedFlagAnalysis]
     risk_level: Optional[RiskLevel]
-    created_at: datetime
-    updated_at: datetime
+    # Stored values are already ISO8601 strings — accept them as-is so
+    # handlers don't have to parse just to re-serialize in the response
+    created_at: Union[datetime, str]
+    updated_at: Union[datetime, str]
     processing_time_seconds: Optional[float]
-    
-    class Config:
-        from_attributes = True
 
 
 class VisitSummary(BaseModel):
     """Condensed visit information for list views"""
+    model_config = ConfigDict(extra="ignore", frozen=True, validate_assignment=False)
     visit_id: str
     patient_name: str
     patient_age: int
@@ -0,0 +1,131 @@
+"""
+Session State Store — Redis-backed with in-memory fallback
+
+Holds per-user intake state and conversation history for the patient chat.
+Backing the state with Redis lets multiple uvicorn workers share one view
+of a session (and survive worker restarts); when Redis is unreachable the
+store degrades to a process-local dict so development setups keep working.
+"""
+import logging
+from typing import Dict, Optional
+
+import orjson
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Abandoned sessions expire server-side after an hour
+_SESSION_TTL_SECONDS = 3600
+
+# In-memory fallback keeps at most this many sessions
+_MAX_SESSIONS = 10_000
+
+
+class InMemorySessionStore:
+    """Process-local session store — development / Redis-down fallback."""
+
+    def __init__(self):
+        self._data: Dict[str, Dict] = {}
+
+    async def get(self, key: str) -> Optional[Dict]:
+        return self._data.get(key)
+
+    async def set(self, key: str, value: Dict) -> None:
+        self._data[key] = value
+        # Insertion-ordered dict: evict the oldest sessions past the cap
+        while len(self._data) > _MAX_SESSIONS:
+            self._data.pop(next(iter(self._data)))
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class SessionStore:
+    """Redis-backed session store that falls back to memory transparently.
+
+    The Redis client is created lazily on first use; any connection error
+    flips the store to the in-memory backend for the rest of the process
+    so one Redis outage doesn't take the chat down.
+    """
+
+    def __init__(self):
+        self._memory = InMemorySessionStore()
+        self._redis: Optional[aioredis.Redis] = None
+        self._redis_failed = False
+
+    def _client(self) -> Optional[aioredis.Redis]:
+        if self._redis is None and not self._redis_failed:
+            try:
+                self._redis = aioredis.from_url(settings.REDIS_URL)
+            except Exception as e:
+                logger.warning("Redis unavailable, using in-memory sessions: %s", e)
+                self._redis_failed = True
+        return self._redis
+
+    def _degrade(self, error: Exception) -> None:
+        logger.warning("Redis error, falling back to in-memory sessions: %s", error)
+        self._redis = None
+        self._redis_failed = True
+
+    async def get(self, key: str) -> Optional[Dict]:
+        client = self._client()
+        if client is not None:
+            try:
+                raw = await client.get(key)
+                return orjson.loads(raw) if raw else None
+            except Exception as e:
+                self._degrade(e)
+        return await self._memory.get(key)
+
+    async def set(self, key: str, value: Dict) -> None:
+        client = self._client()
+        if client is not None:
+            try:
+                await client.set(key, orjson.dumps(value), ex=_SESSION_TTL_SECONDS)
+                return
+            except Exception as e:
+                self._degrade(e)
+        await self._memory.set(key, value)
+
+    async def set_many(self, mapping: Dict[str, Dict]) -> None:
+        """Write several keys in one pipelined round-trip.
+
+        MSET can't carry a TTL, so the SETs go through a non-transactional
+        pipeline instead — one network round-trip either way.
+        """
+        client = self._client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for key, value in mapping.items():
+                        pipe.set(key, orjson.dumps(value), ex=_SESSION_TTL_SECONDS)
+                    await pipe.execute()
+                return
+            except Exception as e:
+                self._degrade(e)
+        for key, value in mapping.items():
+            await self._memory.set(key, value)
+
+    async def delete(self, *keys: str) -> None:
+        client = self._client()
+        if client is not None:
+            try:
+                await client.delete(*keys)
+                return
+            except Exception as e:
+                self._degrade(e)
+        await self._memory.delete(*keys)
+
+
+# Module-level singleton, same pattern as get_storage_service()
+_session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore()
+    return _session_store
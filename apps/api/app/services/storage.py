@@ -186,16 +186,19 @@ def get_storage_service() -> StorageService:
 
 # Lazy wrapper for backwards compatibility
 class LazyStorageService:
-    """Lazy wrapper that defers service creation until first use"""
-    _instance: Optional[StorageService] = None
+    """Lazy wrapper that defers service creation until first use.
+
+    The underlying service is constructed exactly once (shared with
+    get_storage_service) and resolved attributes are promoted onto the
+    wrapper, so repeated calls skip __getattr__ and hit the single
+    service instance directly.
+    """
 
     def __getattr__(self, name):
-        if LazyStorageService._instance is None:
-            try:
-                LazyStorageService._instance = LocalFileStorageService()
-            except Exception as e:
-                logger.warning(f"Could not init local storage: {e}. Using in-memory storage.")
-                LazyStorageService._instance = InMemoryStorageService()
-        return getattr(LazyStorageService._instance, name)
+        service = get_storage_service()
+        attr = getattr(service, name)
+        # Cache the bound attribute so future lookups bypass __getattr__
+        self.__dict__[name] = attr
+        return attr
 
 storage_service = LazyStorageService()